@@ -8,155 +8,281 @@ This script creates:
 3. A D64 disk image containing the program
 """
 
+import argparse
+import base64
+import io
+import mmap
+import os
 import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
 from pathlib import Path
 
 # Output directory
 OUTPUT_DIR = Path(__file__).parent
 
+# D64 geometry
+TRACKS = 35
+SECTOR_SIZE = 256
+TOTAL_SECTORS = 683
+D64_SIZE = TOTAL_SECTORS * SECTOR_SIZE  # 174848 bytes
+
+# Sectors per track (Zone Bit Recording)
+SECTORS_PER_TRACK = [
+    21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21,  # 1-17
+    19, 19, 19, 19, 19, 19, 19,  # 18-24
+    18, 18, 18, 18, 18, 18,      # 25-30
+    17, 17, 17, 17, 17,          # 31-35
+]
+
+# Byte offset of the first sector of each track (index = track - 1)
+TRACK_OFFSETS = [0] + list(accumulate(n * SECTOR_SIZE for n in SECTORS_PER_TRACK))
+
+
+def _bam_mask(num_sectors: int) -> int:
+    """BAM entry of a completely free track as one little-endian uint32."""
+    b0 = 0xFF if num_sectors >= 8 else (1 << num_sectors) - 1
+    b1 = 0xFF if num_sectors >= 16 else ((1 << (num_sectors - 8)) - 1 if num_sectors > 8 else 0)
+    b2 = (1 << (num_sectors - 16)) - 1 if num_sectors > 16 else 0
+    return num_sectors | (b0 << 8) | (b1 << 16) | (b2 << 24)
+
+
+# BAM entries (free count + 3 bitmap bytes) for a completely free track,
+# packed into a uint32 and indexed by the number of sectors on that track
+BAM_U32 = {n: _bam_mask(n) for n in (17, 18, 19, 21)}
+
+# BAM entry for track 18: sectors 0 (BAM) and 1 (directory) are used
+USED18 = (BAM_U32[19] - 2) & ~(0x03 << 8)
+
+# All 35 BAM entries of an empty disk (tracks 1-35)
+EMPTY_BAM = [
+    USED18 if track == 18 else BAM_U32[num_sectors]
+    for track, num_sectors in enumerate(SECTORS_PER_TRACK, start=1)
+]
+
+# BAM entry block in the BAM sector (4 bytes per track)
+BAM_ENTRIES = struct.Struct(f'<{TRACKS}I')
+
+# Track/sector link at the start of every directory and data sector
+SECTOR_LINK = struct.Struct('<BB')
+
+# BAM sector header: first directory track/sector, DOS version, unused
+BAM_HEADER = struct.Struct('<BBBB')
+
+# Directory entry: file type, first data track/sector, filename (0xA0
+# padded), unused, file size in sectors
+DIR_ENTRY = struct.Struct('<BBB16s9sH')
+
+# Fill patterns for the unused directory entry bytes and the BAM padding
+ZERO9 = b'\x00' * 9
+PAD4 = b'\xA0' * 4
+
+# === minimal.prg ===
+# Sets border and background color to black, then returns.
+#
+#     * = $C000
+#     LDA #$00        ; Load 0 (black) into accumulator
+#     STA $D020       ; Store to border color register
+#     STA $D021       ; Store to background color register
+#     RTS             ; Return
+MINIMAL_LOAD_ADDRESS = 0xC000
+
+# PRG = load address (little-endian) + code
+MINIMAL_PRG_BYTES = struct.pack('<H', MINIMAL_LOAD_ADDRESS) + bytes([
+    0xA9, 0x00,       # LDA #$00
+    0x8D, 0x20, 0xD0, # STA $D020
+    0x8D, 0x21, 0xD0, # STA $D021
+    0x60,             # RTS
+])
+
+# === hello.prg ===
+# BASIC stub "10 SYS 2064" followed by machine code at $0810
+HELLO_LOAD_ADDRESS = 0x0801
+
+# BASIC stub of the autostart PRG: 10 SYS 2064
+# Format: [next_line_ptr][line_number][tokens][null][end_marker]
+BASIC_LINE = struct.pack(
+    '<HHB4sBH',
+    0x080C,   # Next line pointer -> $080C
+    10,       # Line number
+    0x9E,     # SYS token
+    b'2064',  # Address as ASCII (points to $0810)
+    0x00,     # End of line
+    0x0000,   # End of program
+)
+
+# Machine code at $0810
+# This program cycles border colors
+HELLO_MACHINE_CODE = bytes([
+    # Initialize
+    0xA9, 0x00,       # LDA #$00       ; Start with black
+
+    # Main loop
+    0x8D, 0x20, 0xD0, # STA $D020      ; Set border color
+    0x8D, 0x21, 0xD0, # STA $D021      ; Set background color
+
+    # Delay loop
+    0xA2, 0x00,       # LDX #$00
+    0xA0, 0x00,       # LDY #$00
+    # delay_inner:
+    0x88,             # DEY
+    0xD0, 0xFD,       # BNE delay_inner (-3)
+    0xCA,             # DEX
+    0xD0, 0xFA,       # BNE delay_inner (-6, to DEY)
+
+    # Next color
+    0x18,             # CLC
+    0x69, 0x01,       # ADC #$01
+    0x29, 0x0F,       # AND #$0F       ; Keep in range 0-15
+
+    # Loop forever
+    0x4C, 0x12, 0x08, # JMP $0812      ; Jump to STA $D020
+])
+
+
+def _build_hello_prg() -> bytes:
+    """Assemble hello.prg: load address + BASIC stub + machine code."""
+    buf = io.BytesIO()
+    buf.write(struct.pack('<H', HELLO_LOAD_ADDRESS))
+    buf.write(BASIC_LINE)
+    # Pad to reach $0810, where the machine code starts
+    buf.write(b'\x00' * (0x0810 - 0x0801 - len(BASIC_LINE)))
+    buf.write(HELLO_MACHINE_CODE)
+    return buf.getvalue()
+
+
+HELLO_PRG_BYTES = _build_hello_prg()
+
+# === test.d64 ===
+# Disk built by create_d64() from hello.prg
+TEST_DISK_NAME = "HELLO DISK"
+TEST_DISK_ID = "C6"
+
+# The finished image, zlib-compressed and base85-encoded (it is almost all
+# zeros). Run with --regenerate to build it with create_d64() instead; that
+# prints a replacement blob whenever the result no longer matches.
+TEST_D64_BLOB = (
+    b'c-rmKF-ikb5P;!%Sh$EFStHmbmV$)@Ngs@$WWmBycnvF?TtOB)uVS_55t9)^h$!hK-S@!{52'
+    b'hFxUR;#wusVpB(dGCmR^DPh?B-|PYqas)E#AA2)5mgt)YMe~000000000000000000000000'
+    b'000000000000000000000000000000000000000000000000000000000000000000000000'
+    b'0000000000002MZ*`eOf0=`m{9nD#+&|9k)tP(S>SdO{-QG0K{cw8sFl*PY$L(nH{n*U`@~O'
+    b'mXY5QX{EItST000000000000000000000000000000000000000000000000000000000000'
+    b'000000000000000000000000000000000000000x^#y6QZCC'
+)
+
+
+def write_all(items: list[tuple[Path, bytes]]):
+    """
+    Write several whole files in one batch.
 
-def create_minimal_prg():
+    Every file is opened, written and only then are all descriptors closed,
+    so the directory updates happen together.
+    """
+    fds = []
+    try:
+        for path, data in items:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            fds.append(fd)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+
+def _pad(data: bytes, size: int, fill: bytes = b'\xA0') -> bytes:
+    """Cut or pad a disk field to exactly size bytes."""
+    if len(data) < size:
+        return data + fill * (size - len(data))
+    return data[:size]
+
+
+def _sector_chain(track: int, sector: int, count: int) -> list[tuple[int, int]]:
+    """Track/sector of count consecutive file sectors, skipping track 18."""
+    chain = []
+    for _ in range(count):
+        chain.append((track, sector))
+        sector += 1
+        if sector >= SECTORS_PER_TRACK[track - 1]:
+            track += 1
+            if track == 18:
+                track = 19  # Skip directory track
+            sector = 0
+    return chain
+
+
+def build_minimal_prg():
     """
-    Create a minimal PRG that changes border color to black.
+    Build a minimal PRG that changes border color to black.
 
     Load address: $C000
     Usage: LOAD "MINIMAL.PRG",8,1 then SYS 49152
 
-    Assembly:
-        * = $C000
-        LDA #$00        ; Load 0 (black) into accumulator
-        STA $D020       ; Store to border color register
-        STA $D021       ; Store to background color register
-        RTS             ; Return
+    Returns the output path and the precomputed MINIMAL_PRG_BYTES; the
+    caller writes the file.
     """
-    load_address = 0xC000
-
-    # Machine code
-    code = bytes([
-        0xA9, 0x00,       # LDA #$00
-        0x8D, 0x20, 0xD0, # STA $D020
-        0x8D, 0x21, 0xD0, # STA $D021
-        0x60,             # RTS
-    ])
+    return OUTPUT_DIR / "minimal.prg", MINIMAL_PRG_BYTES
 
-    # PRG = load address (little-endian) + code
-    prg = struct.pack('<H', load_address) + code
-
-    output_path = OUTPUT_DIR / "minimal.prg"
-    output_path.write_bytes(prg)
-    print(f"Created: {output_path} ({len(prg)} bytes)")
-    print(f"  Load address: ${load_address:04X}")
-    print(f"  Usage: LOAD \"MINIMAL\",8,1 then SYS {load_address}")
-
-    return output_path
 
-
-def create_autostart_prg():
+def build_autostart_prg():
     """
-    Create a PRG with BASIC stub that auto-runs when you type RUN.
+    Build a PRG with BASIC stub that auto-runs when you type RUN.
 
     The BASIC stub is: 10 SYS 2064
 
     Load address: $0801 (BASIC program area)
     Usage: LOAD "HELLO.PRG",8 then RUN
-    """
-    load_address = 0x0801
-
-    # BASIC stub: 10 SYS 2064
-    # Format: [next_line_ptr][line_number][tokens][null][end_marker]
-
-    basic_stub = bytearray()
-
-    # Pointer to next BASIC line (will calculate after)
-    # Line starts at $0801, we need pointer to end
-    next_line_ptr = 0x080D  # $0801 + 12 bytes
-    basic_stub.extend(struct.pack('<H', next_line_ptr))  # $0801-$0802
 
-    # Line number: 10
-    basic_stub.extend(struct.pack('<H', 10))  # $0803-$0804
-
-    # SYS token
-    basic_stub.append(0x9E)  # $0805
-
-    # Space
-    basic_stub.append(0x20)  # $0806
-
-    # Address as ASCII: "2064" (points to $0810)
-    basic_stub.extend(b'2064')  # $0807-$080A
-
-    # End of line
-    basic_stub.append(0x00)  # $080B
-
-    # End of BASIC program (null pointer)
-    basic_stub.extend([0x00, 0x00])  # $080C-$080D
-
-    # Machine code starts at $080E = 2062... let me recalculate
-    # Actually: $0801 + len(stub) = $0801 + 14 = $080F = 2063
-    # Let's use 2064 = $0810, so we need padding
-
-    # Recalculate for SYS 2064 ($0810)
-    basic_stub = bytearray()
-
-    # Next line pointer: end of this line
-    basic_stub.extend([0x0C, 0x08])  # -> $080C
-
-    # Line number 10
-    basic_stub.extend([0x0A, 0x00])
-
-    # SYS token + space + "2064" + null
-    basic_stub.append(0x9E)  # SYS
-    basic_stub.extend(b'2064')  # ASCII
-    basic_stub.append(0x00)  # End of line
+    Returns the output path and the precomputed HELLO_PRG_BYTES; the
+    caller writes the file.
+    """
+    return OUTPUT_DIR / "hello.prg", HELLO_PRG_BYTES
 
-    # End of program
-    basic_stub.extend([0x00, 0x00])
 
-    # Pad to reach $0810
-    while len(basic_stub) < (0x0810 - 0x0801):
-        basic_stub.append(0x00)
+def _decode_d64_blob(blob: bytes) -> bytes:
+    """Decompress a baked D64 image."""
+    return zlib.decompress(base64.b85decode(blob))
 
-    # Machine code at $0810
-    # This program cycles border colors
-    machine_code = bytes([
-        # Initialize
-        0xA9, 0x00,       # LDA #$00       ; Start with black
 
-        # Main loop
-        0x8D, 0x20, 0xD0, # STA $D020      ; Set border color
-        0x8D, 0x21, 0xD0, # STA $D021      ; Set background color
+def _encode_d64_blob(d64: bytes) -> str:
+    """Encode a D64 image as the source of a TEST_D64_BLOB assignment."""
+    encoded = base64.b85encode(zlib.compress(d64, 9)).decode('ascii')
+    lines = [f"    b'{encoded[i:i + 72]}'" for i in range(0, len(encoded), 72)]
+    return "TEST_D64_BLOB = (\n" + "\n".join(lines) + "\n)"
 
-        # Delay loop
-        0xA2, 0x00,       # LDX #$00
-        0xA0, 0x00,       # LDY #$00
-        # delay_inner:
-        0x88,             # DEY
-        0xD0, 0xFD,       # BNE delay_inner (-3)
-        0xCA,             # DEX
-        0xD0, 0xFA,       # BNE delay_inner (-6, to DEY)
 
-        # Next color
-        0x18,             # CLC
-        0x69, 0x01,       # ADC #$01
-        0x29, 0x0F,       # AND #$0F       ; Keep in range 0-15
+def build_baked_d64():
+    """
+    Build the D64 disk image from the prebuilt TEST_D64_BLOB.
 
-        # Loop forever
-        0x4C, 0x12, 0x08, # JMP $0812      ; Jump to STA $D020
-    ])
+    Produces the same file as create_d64() with hello.prg, without
+    running the generator. The image is checked against HELLO_PRG_BYTES,
+    TEST_DISK_NAME and TEST_DISK_ID so a stale blob is reported instead
+    of being written.
 
-    # Combine
-    prg_data = bytes(basic_stub) + machine_code
+    Returns the output path and the image; the caller writes the file.
+    """
+    d64 = _decode_d64_blob(TEST_D64_BLOB)
 
-    # PRG file
-    prg = struct.pack('<H', load_address) + prg_data
+    bam_offset = TRACK_OFFSETS[17]
+    dir_offset = bam_offset + SECTOR_SIZE
+    _, data_track, data_sector, filename, _, sectors = DIR_ENTRY.unpack_from(d64, dir_offset + 2)
+    data_offset = TRACK_OFFSETS[data_track - 1] + data_sector * SECTOR_SIZE
+    first_chunk = HELLO_PRG_BYTES[:254]
 
-    output_path = OUTPUT_DIR / "hello.prg"
-    output_path.write_bytes(prg)
-    print(f"Created: {output_path} ({len(prg)} bytes)")
-    print(f"  Load address: ${load_address:04X}")
-    print(f"  Usage: LOAD \"HELLO\",8 then RUN")
-    print(f"  Effect: Cycles through all 16 border colors")
+    if (
+        d64[bam_offset + 0x90:bam_offset + 0xA0] != _pad(TEST_DISK_NAME.upper().encode('ascii'), 16)
+        or d64[bam_offset + 0xA2:bam_offset + 0xA4] != _pad(TEST_DISK_ID.encode('ascii'), 2, b'0')
+        or (data_track, data_sector) != (1, 0)
+        or filename != _pad(b'HELLO', 16)
+        or sectors != (len(HELLO_PRG_BYTES) + 253) // 254
+        or d64[data_offset + 2:data_offset + 2 + len(first_chunk)] != first_chunk
+    ):
+        raise ValueError("TEST_D64_BLOB is out of date, run with --regenerate to rebuild it")
 
-    return output_path
+    return OUTPUT_DIR / "test.d64", d64
 
 
 def create_d64(prg_path: Path, disk_name: str = "TEST DISK", disk_id: str = "01"):
@@ -167,181 +293,117 @@ def create_d64(prg_path: Path, disk_name: str = "TEST DISK", disk_id: str = "01"
     - 35 tracks, 683 sectors total
     - Each sector is 256 bytes
     - Track 18 contains BAM (sector 0) and directory (sectors 1-18)
-    """
-
-    # Constants
-    TRACKS = 35
-    SECTOR_SIZE = 256
-    TOTAL_SECTORS = 683
-    D64_SIZE = TOTAL_SECTORS * SECTOR_SIZE  # 174848 bytes
 
-    # Sectors per track (Zone Bit Recording)
-    SECTORS_PER_TRACK = [
-        21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21,  # 1-17
-        19, 19, 19, 19, 19, 19, 19,  # 18-24
-        18, 18, 18, 18, 18, 18,      # 25-30
-        17, 17, 17, 17, 17,          # 31-35
-    ]
+    Only populated sectors are written; the image is sized up front so all
+    other sectors read back as zeros.
+    """
 
     def track_sector_to_offset(track: int, sector: int) -> int:
         """Convert track/sector to byte offset in D64."""
-        offset = 0
-        for t in range(1, track):
-            offset += SECTORS_PER_TRACK[t - 1] * SECTOR_SIZE
-        offset += sector * SECTOR_SIZE
-        return offset
-
-    # Initialize disk image with zeros
-    disk = bytearray(D64_SIZE)
+        return TRACK_OFFSETS[track - 1] + sector * SECTOR_SIZE
 
     # === BAM (Block Availability Map) at Track 18, Sector 0 ===
     bam_offset = track_sector_to_offset(18, 0)
+    bam = bytearray(SECTOR_SIZE)
 
-    # Track/sector of first directory sector
-    disk[bam_offset + 0] = 18  # Track
-    disk[bam_offset + 1] = 1   # Sector
-
-    # DOS version type
-    disk[bam_offset + 2] = 0x41  # 'A'
-    disk[bam_offset + 3] = 0x00  # Unused
-
-    # BAM entries for tracks 1-35 (4 bytes each)
-    bam_ptr = bam_offset + 4
-    for track in range(1, TRACKS + 1):
-        num_sectors = SECTORS_PER_TRACK[track - 1]
-
-        if track == 18:
-            # Track 18 is partially used (BAM + directory)
-            # Mark sectors 0-1 as used, rest free
-            free_sectors = num_sectors - 2
-            disk[bam_ptr] = free_sectors
-            disk[bam_ptr + 1] = 0xFC  # 11111100 - sectors 0,1 used
-            disk[bam_ptr + 2] = 0xFF
-            disk[bam_ptr + 3] = 0x07 if num_sectors > 16 else 0xFF
-        else:
-            # All sectors free
-            disk[bam_ptr] = num_sectors
-            # Set bits for available sectors
-            if num_sectors >= 8:
-                disk[bam_ptr + 1] = 0xFF
-            else:
-                disk[bam_ptr + 1] = (1 << num_sectors) - 1
-            if num_sectors >= 16:
-                disk[bam_ptr + 2] = 0xFF
-            else:
-                disk[bam_ptr + 2] = (1 << (num_sectors - 8)) - 1 if num_sectors > 8 else 0x00
-            if num_sectors > 16:
-                disk[bam_ptr + 3] = (1 << (num_sectors - 16)) - 1
-            else:
-                disk[bam_ptr + 3] = 0x00
-
-        bam_ptr += 4
+    # Track/sector of first directory sector, DOS version type 'A', unused
+    BAM_HEADER.pack_into(bam, 0, 18, 1, 0x41, 0x00)
 
     # Disk name (16 bytes, padded with 0xA0)
-    disk_name_bytes = disk_name.upper().encode('ascii')[:16]
-    disk_name_bytes = disk_name_bytes.ljust(16, b'\xA0')
-    disk[bam_offset + 0x90:bam_offset + 0xA0] = disk_name_bytes
+    bam[0x90:0xA0] = _pad(disk_name.upper().encode('ascii'), 16)
 
     # Padding
-    disk[bam_offset + 0xA0] = 0xA0
-    disk[bam_offset + 0xA1] = 0xA0
+    bam[0xA0] = 0xA0
+    bam[0xA1] = 0xA0
 
     # Disk ID (2 bytes)
-    disk_id_bytes = disk_id.encode('ascii')[:2].ljust(2, b'0')
-    disk[bam_offset + 0xA2:bam_offset + 0xA4] = disk_id_bytes
+    bam[0xA2:0xA4] = _pad(disk_id.encode('ascii'), 2, b'0')
 
     # Padding
-    disk[bam_offset + 0xA4] = 0xA0
+    bam[0xA4] = 0xA0
 
     # DOS type "2A"
-    disk[bam_offset + 0xA5] = 0x32  # '2'
-    disk[bam_offset + 0xA6] = 0x41  # 'A'
+    bam[0xA5] = 0x32  # '2'
+    bam[0xA6] = 0x41  # 'A'
 
     # More padding
-    for i in range(0xA7, 0xAB):
-        disk[bam_offset + i] = 0xA0
+    bam[0xA7:0xAB] = PAD4
 
     # === Directory at Track 18, Sector 1 ===
     dir_offset = track_sector_to_offset(18, 1)
+    directory = bytearray(SECTOR_SIZE)
 
     # First two bytes: track/sector of next directory block (0 = none)
-    disk[dir_offset + 0] = 0x00
-    disk[dir_offset + 1] = 0xFF  # Indicates last directory sector
+    # 0xFF indicates the last directory sector
+    SECTOR_LINK.pack_into(directory, 0, 0x00, 0xFF)
 
     # === Add PRG file to directory ===
-    prg_data = prg_path.read_bytes()
+    # Single whole-file read, no BufferedReader needed
+    with open(prg_path, 'rb', buffering=0) as f:
+        prg_data = f.readall()
     prg_name = prg_path.stem.upper()[:16]
 
     # Directory entry starts at offset 2 in directory sector
-    entry_offset = dir_offset + 2
-
-    # File type: PRG (0x82 = PRG + closed)
-    disk[entry_offset + 0] = 0x82
+    entry_offset = 2
 
     # Track/sector of first data block
     data_track = 1
     data_sector = 0
-    disk[entry_offset + 1] = data_track
-    disk[entry_offset + 2] = data_sector
 
     # Filename (16 bytes, padded with 0xA0)
-    filename = prg_name.encode('ascii').ljust(16, b'\xA0')
-    disk[entry_offset + 3:entry_offset + 19] = filename
-
-    # Unused bytes
-    for i in range(19, 28):
-        disk[entry_offset + i] = 0x00
+    filename = _pad(prg_name.encode('ascii'), 16)
 
     # File size in sectors
     file_size = len(prg_data)
     sectors_needed = (file_size + 253) // 254  # 254 bytes of data per sector
-    disk[entry_offset + 28] = sectors_needed & 0xFF
-    disk[entry_offset + 29] = (sectors_needed >> 8) & 0xFF
+
+    # File type: PRG (0x82 = PRG + closed)
+    DIR_ENTRY.pack_into(
+        directory, entry_offset,
+        0x82, data_track, data_sector, filename, ZERO9, sectors_needed & 0xFFFF,
+    )
 
     # === Write file data ===
-    # Mark sectors as used in BAM
-    bam_ptr = bam_offset + 4  # Track 1 BAM entry
-
-    data_offset = track_sector_to_offset(data_track, data_sector)
-    remaining_data = prg_data
-    current_track = data_track
-    current_sector = data_sector
-
-    while remaining_data:
-        sector_offset = track_sector_to_offset(current_track, current_sector)
-
-        # Mark sector as used in BAM
-        bam_entry_offset = bam_offset + 4 + (current_track - 1) * 4
-        disk[bam_entry_offset] -= 1  # Decrease free count
-        byte_index = current_sector // 8
-        bit_index = current_sector % 8
-        disk[bam_entry_offset + 1 + byte_index] &= ~(1 << bit_index)
-
-        if len(remaining_data) <= 254:
-            # Last sector
-            disk[sector_offset + 0] = 0x00  # No next track
-            disk[sector_offset + 1] = len(remaining_data) + 1  # Bytes used
-            disk[sector_offset + 2:sector_offset + 2 + len(remaining_data)] = remaining_data
-            remaining_data = b''
-        else:
-            # More data follows
-            next_sector = current_sector + 1
-            if next_sector >= SECTORS_PER_TRACK[current_track - 1]:
-                current_track += 1
-                if current_track == 18:
-                    current_track = 19  # Skip directory track
-                next_sector = 0
-
-            disk[sector_offset + 0] = current_track
-            disk[sector_offset + 1] = next_sector
-            disk[sector_offset + 2:sector_offset + 256] = remaining_data[:254]
-            remaining_data = remaining_data[254:]
-            current_sector = next_sector
-
-    # Write D64 file
+    # The sectors of the file are laid out up front. Each one links to the
+    # next; the last stores no next track, followed by the number of bytes used
+    chain = _sector_chain(data_track, data_sector, sectors_needed)
+    links = chain[1:] + [(0x00, file_size - (sectors_needed - 1) * 254 + 1)]
+
+    # BAM entries for tracks 1-35, stored once in their final state: the
+    # file's sectors are taken out of the free bitmap and count of each track
+    used = [0] * TRACKS        # Bitmap of the file's sectors per track
+    used_count = [0] * TRACKS  # Number of the file's sectors per track
+    for track, sector in chain:
+        used[track - 1] |= 1 << sector
+        used_count[track - 1] += 1
+    BAM_ENTRIES.pack_into(bam, 4, *(
+        (entry & ~(mask << 8)) - count
+        for entry, mask, count in zip(EMPTY_BAM, used, used_count)
+    ))
+
+    # Walk the file by index instead of re-slicing the remaining bytes
+    view = memoryview(prg_data)
+
     output_path = OUTPUT_DIR / "test.d64"
-    output_path.write_bytes(disk)
-    print(f"Created: {output_path} ({len(disk)} bytes)")
+    fd = os.open(output_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        # Size the image up front and map it; the OS supplies zero pages for
+        # every sector that is never touched
+        os.ftruncate(fd, D64_SIZE)
+        with mmap.mmap(fd, D64_SIZE) as disk:
+            for (track, sector), link, pos in zip(chain, links, range(0, file_size, 254)):
+                sector_offset = TRACK_OFFSETS[track - 1] + sector * SECTOR_SIZE
+                chunk = view[pos:pos + 254]
+                SECTOR_LINK.pack_into(disk, sector_offset, *link)
+                disk[sector_offset + 2:sector_offset + 2 + len(chunk)] = chunk
+
+            disk[bam_offset:bam_offset + SECTOR_SIZE] = bam
+            disk[dir_offset:dir_offset + SECTOR_SIZE] = directory
+    finally:
+        os.close(fd)
+        view.release()
+
+    print(f"Created: {output_path} ({D64_SIZE} bytes)")
     print(f"  Disk name: {disk_name}")
     print(f"  Contains: {prg_name}.PRG")
 
@@ -349,24 +411,61 @@ def create_d64(prg_path: Path, disk_name: str = "TEST DISK", disk_id: str = "01"
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Create C64 test PRG and D64 files.")
+    parser.add_argument(
+        '--regenerate', action='store_true',
+        help="build test.d64 from hello.prg instead of using the baked image",
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("C64 Test File Generator")
     print("=" * 60)
     print()
 
-    # Create minimal PRG
-    print("1. Creating minimal PRG...")
-    minimal_prg = create_minimal_prg()
-    print()
-
-    # Create autostart PRG
-    print("2. Creating autostart PRG...")
-    hello_prg = create_autostart_prg()
-    print()
-
-    # Create D64 with the hello program
-    print("3. Creating D64 disk image...")
-    d64_path = create_d64(hello_prg, "HELLO DISK", "C6")
+    minimal_prg, minimal_data = build_minimal_prg()
+    hello_prg, hello_data = build_autostart_prg()
+    if not args.regenerate:
+        d64_path, d64_data = build_baked_d64()
+
+    # Both PRGs go out in one batch while the D64 is written concurrently;
+    # each file is only reported once its write has finished
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        prg_write = executor.submit(write_all, [(minimal_prg, minimal_data), (hello_prg, hello_data)])
+        if not args.regenerate:
+            d64_write = executor.submit(write_all, [(d64_path, d64_data)])
+
+        # Create minimal PRG
+        print("1. Creating minimal PRG...")
+        prg_write.result()
+        print(f"Created: {minimal_prg} ({len(minimal_data)} bytes)")
+        print(f"  Load address: ${MINIMAL_LOAD_ADDRESS:04X}")
+        print(f"  Usage: LOAD \"MINIMAL\",8,1 then SYS {MINIMAL_LOAD_ADDRESS}")
+        print()
+
+        # Create autostart PRG
+        print("2. Creating autostart PRG...")
+        print(f"Created: {hello_prg} ({len(hello_data)} bytes)")
+        print(f"  Load address: ${HELLO_LOAD_ADDRESS:04X}")
+        print(f"  Usage: LOAD \"HELLO\",8 then RUN")
+        print(f"  Effect: Cycles through all 16 border colors")
+        print()
+
+        # Create D64 with the hello program
+        print("3. Creating D64 disk image...")
+        if args.regenerate:
+            # The generator reads hello.prg back from disk
+            d64_path = create_d64(hello_prg, TEST_DISK_NAME, TEST_DISK_ID)
+            d64_data = d64_path.read_bytes()
+            if d64_data != _decode_d64_blob(TEST_D64_BLOB):
+                print()
+                print("  test.d64 differs from the baked image, replace it with:")
+                print(_encode_d64_blob(d64_data))
+        else:
+            d64_write.result()
+            print(f"Created: {d64_path} ({len(d64_data)} bytes)")
+            print(f"  Disk name: {TEST_DISK_NAME}")
+            print(f"  Contains: {hello_prg.stem.upper()}.PRG")
     print()
 
     print("=" * 60)